@@ -4,6 +4,8 @@ import numpy as np
 import matplotlib.pyplot as plt
 import pandas as pd
 import os
+import csv
+import json
 import traceback
 from PyQt5.QtWidgets import (
     QApplication,
@@ -23,8 +25,9 @@ from PyQt5.QtWidgets import (
     QSplitter,
     QTextEdit
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QObject, QThread, QMutex, QTimer, pyqtSignal, pyqtSlot
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas, NavigationToolbar2QT as NavigationToolbar
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from matplotlib.figure import Figure
 
 # Try to import pyvisa with better error handling
@@ -35,6 +38,265 @@ except ImportError:
     VISA_AVAILABLE = False
     print("PyVISA not installed. Running in simulation mode.")
 
+# PyArrow is optional: it enables the Feather and Parquet data formats
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Pillow is optional: it enables the direct PNG export path in save_plot
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+# PyTables is optional: pandas needs it for the HDF5 data format
+try:
+    import tables
+    TABLES_AVAILABLE = True
+except ImportError:
+    TABLES_AVAILABLE = False
+
+# Numba is optional: without it the numeric kernels below run as plain NumPy
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Stand-in for numba.njit that leaves the function unchanged."""
+        def decorator(func):
+            return func
+        return decorator
+
+# Plot colors as RGBA tuples, so matplotlib does not parse color strings on every draw
+BLUE = (0.0, 0.0, 1.0, 1.0)
+RED = (1.0, 0.0, 0.0, 1.0)
+GREEN = (0.0, 0.5, 0.0, 1.0)
+
+# Point count range accepted by :SOUR:SWE:POIN / :TRIG:COUN for an on-board sweep
+ONBOARD_SWEEP_MIN_POINTS = 2
+ONBOARD_SWEEP_MAX_POINTS = 2500
+
+# Per-point timing estimate for the on-board sweep timeout: integration time is
+# NPLC / line frequency (50 Hz, the slower mains, so the estimate errs long) plus overhead
+LINE_FREQUENCY = 50.0
+POINT_OVERHEAD_SECONDS = 0.05
+DEFAULT_NPLC = 1.0  # Used when the NPLC field is empty (the *RST setting)
+
+# Column names used in saved data files
+DATA_COLUMNS = ['Voltage (V)', 'Current (A)', 'Power (W)']
+
+# Columns read back from CSV data files; power is derived from V and I on load
+_LOAD_DTYPES = {'Voltage (V)': np.float32, 'Current (A)': np.float32}
+
+# CSV files larger than this are read in chunks of CSV_CHUNK_ROWS rows
+CSV_CHUNK_BYTES = 100 * 1024 * 1024
+CSV_CHUNK_ROWS = 200_000
+
+# File dialog filter for each supported data format, in order of preference
+DATA_FILE_FILTERS = {}
+if PYARROW_AVAILABLE:
+    DATA_FILE_FILTERS['.parquet'] = "Parquet Files (*.parquet)"
+    DATA_FILE_FILTERS['.feather'] = "Feather Files (*.feather)"
+if TABLES_AVAILABLE:
+    DATA_FILE_FILTERS['.h5'] = "HDF5 Files (*.h5)"
+DATA_FILE_FILTERS['.csv'] = "CSV Files (*.csv)"
+
+@njit(cache=True, fastmath=True)
+def _simulate_iv(v, isc, voc, vt, noise):
+    """Simple solar cell model I = Isc * (1 - exp((V-Voc)/Vt)) plus noise, clipped at zero."""
+    current = np.maximum(isc * (1.0 - np.exp((v - voc) / vt)) + noise, 0.0)
+    return np.where(v >= voc, 0.0, current)
+
+@njit(cache=True, fastmath=True)
+def _mpp(voltages, currents, powers):
+    """Return the index, voltage, current and power of the maximum power point."""
+    idx = np.argmax(powers)
+    return idx, voltages[idx], currents[idx], powers[idx]
+
+class SweepWorker(QObject):
+    """Run the voltage sweep off the GUI thread and stream samples back as signals."""
+    sampleReady = pyqtSignal(float, float, float)  # voltage, current, power
+    blockReady = pyqtSignal(object, object, object)  # voltage, current, power arrays
+    logMessage = pyqtSignal(str)
+    finished = pyqtSignal(bool)  # True if the sweep was aborted
+
+    def __init__(self, keithley, simulation_mode, start, stop, points, delay, onboard_sweep=False,
+                 restore_nplc=None, point_time=None):
+        super().__init__()
+        self.keithley = keithley
+        self.simulation_mode = simulation_mode
+        self.onboard_sweep = onboard_sweep
+        self.restore_nplc = restore_nplc  # Integration time to put back after the sweep
+        
+        # Latest (point number, voltage); polled by the GUI instead of signalled per point
+        self._progress = None
+        self.start = start
+        self.stop = stop
+        self.points = points
+        self.delay = delay
+        # Estimated instrument seconds per point, including integration time
+        self.point_time = point_time if point_time is not None else delay + POINT_OVERHEAD_SECONDS
+
+        # Abort flag is set from the GUI thread and read from the worker thread
+        self._abort_mutex = QMutex()
+        self._abort_sweep = False
+
+    def abort(self):
+        """Request the sweep to stop after the current point."""
+        self._abort_mutex.lock()
+        self._abort_sweep = True
+        self._abort_mutex.unlock()
+
+    def is_aborted(self):
+        """Return True once an abort has been requested."""
+        self._abort_mutex.lock()
+        aborted = self._abort_sweep
+        self._abort_mutex.unlock()
+        return aborted
+
+    def latest_progress(self):
+        """Return the latest (point number, voltage) pair, or None before the first point."""
+        return self._progress
+
+    @pyqtSlot()
+    def run(self):
+        """Perform voltage sweep and measure current."""
+        if self.onboard_sweep and not self.simulation_mode:
+            try:
+                aborted = self.run_onboard_sweep()
+            except Exception as e:
+                aborted = False
+                error_msg = f"Error during on-board sweep: {str(e)}"
+                self.logMessage.emit(error_msg)
+                print(error_msg)
+        else:
+            aborted = self.run_point_by_point()
+        
+        # Turn off output when done
+        if not self.simulation_mode:
+            try:
+                self.keithley.write(':SOUR:VOLT 0')  # Set voltage to zero first
+                self.keithley.write(':OUTP OFF')      # Turn off output
+                self.keithley.write(':DISP:ENAB ON')  # Restore the front panel display
+                self.keithley.write(':SYST:AZER:STAT ON')  # Restore autozero
+                self.keithley.write(':SENS:FUNC:CONC ON')  # Restore concurrent measurements
+                if self.restore_nplc:
+                    self.keithley.write(f':SENS:CURR:NPLC {self.restore_nplc}')
+                self.logMessage.emit("Sweep complete. Output turned OFF")
+            except Exception as e:
+                self.logMessage.emit(f"Error turning off output: {str(e)}")
+        
+        self.finished.emit(aborted)
+
+    def run_onboard_sweep(self):
+        """Run the staircase sweep programmed by setupIV and read all points in one transfer."""
+        if self.is_aborted():
+            return True
+        
+        self.logMessage.emit(f"Running on-board sweep of {self.points} points")
+        
+        # The whole sweep runs on the instrument before any reading comes back,
+        # so allow for the full sweep duration in the VISA timeout
+        timeout = self.keithley.timeout
+        self.keithley.timeout = max(timeout, int(self.points * self.point_time * 1000) + 10000)
+        try:
+            self.keithley.write(':INIT')
+            self.keithley.query('*OPC?')  # Wait for the sweep to complete
+            raw = self.keithley.query_binary_values(':FETC?', datatype='f', is_big_endian=False,
+                                                    container=np.ndarray)
+        finally:
+            self.keithley.timeout = timeout
+        
+        # One row per point: voltage, current, then any extra elements
+        readings = raw.reshape(self.points, -1)
+        voltages = readings[:, 0]
+        currents = readings[:, 1]
+        currents *= -1.0  # Invert current as requested, in place for the whole block
+        powers = voltages * currents
+        
+        self._progress = (self.points, float(voltages[-1]))
+        self.blockReady.emit(voltages, currents, powers)
+        return False
+
+    def run_point_by_point(self):
+        """Set and measure each point from Python, checking for abort in between."""
+        start, stop, points, delay = self.start, self.stop, self.points, self.delay
+        # Uniform grid start + step*i with a constant stride
+        step = (stop - start) / (points - 1) if points > 1 else 0.0
+        sweep_values = np.arange(points, dtype=np.float64) * step + start
+        aborted = False
+        sign = -1.0  # Measured current is inverted as requested
+        
+        # Create progress tracking
+        total_points = len(sweep_values)
+        
+        if self.simulation_mode:
+            # In simulation mode, generate synthetic data for the whole sweep at once
+            # Simulate a solar cell I-V curve
+            # Simple model: I = Isc * (1 - exp((V-Voc)/Vt))
+            isc = 0.5  # Short circuit current
+            voc = stop * 0.8  # Open circuit voltage
+            vt = 0.6  # Thermal voltage
+            
+            # Add some noise; negative currents are clipped to zero
+            rng = np.random.default_rng()
+            sim_currents = _simulate_iv(sweep_values, isc, voc, vt, rng.normal(0, 0.01, total_points))
+            sim_powers = sweep_values * sim_currents
+        
+        for idx, voltage in enumerate(sweep_values):
+            if self.is_aborted():
+                aborted = True
+                break
+            
+            try:
+                # Record progress for the GUI to pick up
+                self._progress = (idx + 1, voltage)
+                
+                if self.simulation_mode:
+                    # Take the precomputed synthetic point
+                    measured_voltage = voltage
+                    measured_current = sim_currents[idx]
+                    power = sim_powers[idx]
+                    
+                    # Simulate measurement delay
+                    time.sleep(delay / 10)  # Faster in simulation
+                else:
+                    # Real hardware control
+                    # Set the source voltage
+                    self.keithley.write(f':SOUR:VOLT {voltage}')
+                    
+                    # Measure the values (the instrument waits :SOUR:DEL before measuring;
+                    # binary REAL,32 transfer is configured in setupIV)
+                    values = self.keithley.query_binary_values(':READ?', datatype='f', is_big_endian=False,
+                                                               container=np.ndarray)
+                    
+                    if len(values) >= 2:
+                        measured_voltage = float(values[0])
+                        measured_current = float(values[1]) * sign
+                    else:
+                        raise ValueError("Invalid measurement response")
+                    
+                    # Calculate power
+                    power = measured_voltage * measured_current
+                
+                # Hand the data point to the GUI thread
+                self.sampleReady.emit(measured_voltage, measured_current, power)
+                
+            except Exception as e:
+                error_msg = f"Error at voltage {voltage}: {str(e)}"
+                self.logMessage.emit(error_msg)
+                print(error_msg)
+                # Continue with the next point instead of stopping the whole sweep
+        
+        return aborted
+
 class MPPTSweepApp(QWidget):
     def __init__(self):
         super().__init__()
@@ -42,14 +304,43 @@ class MPPTSweepApp(QWidget):
         # Initialize GPIB variables
         self.GPIB_ADDRESS = 21
         self.rm = None
+        self._rm_cache = (None, 0.0)  # (last list_resources() result, time.monotonic() stamp)
+        self._last_dir = ""  # Directory of the last file dialog selection
+        self._restore_nplc = None  # NPLC read back in setupIV, restored after the sweep
+        self._file_dialogs = {}  # Reused QFileDialog per purpose, see get_file_path
         self.keithley = None
-        self.abort_sweep = False
         self.simulation_mode = False
         
-        # Data storage
-        self.voltages = []
-        self.currents = []
-        self.powers = []
+        # Sweep thread and worker (only set while a sweep is running)
+        self.sweep_thread = None
+        self.sweep_worker = None
+        
+        # Data storage (preallocated per sweep, only the first _n points are valid)
+        self.voltages = np.empty(0)
+        self.currents = np.empty(0)
+        self.powers = np.empty(0)
+        self._n = 0
+        
+        # Live plot state: blitting is active only while a sweep is running
+        self._blitting = False
+        self._bg = None
+        self._plot_pending = False
+        
+        # tight_layout is only rerun when axes or labels changed, not on data updates
+        self._layout_dirty = True
+        self._analysis_layout_dirty = True
+        
+        # Open CSV file and writer while data is streamed to disk during a sweep
+        self._stream_file = None
+        self._stream_writer = None
+        
+        # Status bar progress is refreshed at 10 Hz rather than on every point
+        self.progress_timer = QTimer(self)
+        self.progress_timer.setInterval(100)
+        self.progress_timer.timeout.connect(self.update_sweep_progress)
+        
+        # Compile the numeric kernels now rather than at the end of the first sweep
+        self.warm_up_kernels()
 
         # Check if PyVISA is available
         if not VISA_AVAILABLE:
@@ -61,7 +352,7 @@ class MPPTSweepApp(QWidget):
             try:
                 self.rm = pyvisa.ResourceManager()
                 # List available resources for debugging
-                self.available_resources = self.rm.list_resources()
+                self.available_resources = self._list_resources()
             except Exception as e:
                 self.simulation_mode = True
                 QMessageBox.warning(self, "VISA Error", 
@@ -69,6 +360,24 @@ class MPPTSweepApp(QWidget):
 
         self.initUI()
 
+    def warm_up_kernels(self):
+        """Run the Numba kernels once on dummy data to pay the compilation cost up front.
+        
+        Covers the array types the app produces: float64 sweeps, float32 large sweeps
+        and CSV loads, and read-only voltage/current arrays from Arrow files.
+        Any other combination is still compiled on first use.
+        """
+        if not NUMBA_AVAILABLE:
+            return
+        dummy = np.zeros(2)
+        _simulate_iv(dummy, 0.5, 1.0, 0.6, dummy)
+        for dtype in (np.float64, np.float32):
+            values = np.zeros(2, dtype=dtype)
+            read_only = values.copy()
+            read_only.flags.writeable = False
+            _mpp(values, values, values)
+            _mpp(read_only, read_only, values)
+
     def initUI(self):
         # Main layout
         main_layout = QVBoxLayout()
@@ -130,6 +439,11 @@ class MPPTSweepApp(QWidget):
         self.four_wire_check = QCheckBox("Use 4-Wire Sensing (Default: 2-Wire)")
         init_layout.addWidget(self.four_wire_check)
         
+        # On-board sweep runs the whole staircase on the instrument
+        self.onboard_sweep_check = QCheckBox("Use On-Board Sweep (faster, abort waits for completion)")
+        self.onboard_sweep_check.setChecked(True)
+        init_layout.addWidget(self.onboard_sweep_check)
+        
         init_group.setLayout(init_layout)
         control_panel.addWidget(init_group)
         
@@ -162,6 +476,11 @@ class MPPTSweepApp(QWidget):
         self.max_current_input = QLineEdit("0.5")
         param_layout.addWidget(self.max_current_input, 4, 1)
         
+        # Integration time (lower NPLC = faster but noisier readings)
+        param_layout.addWidget(QLabel("NPLC:"), 5, 0)
+        self.nplc_input = QLineEdit("0.1")
+        param_layout.addWidget(self.nplc_input, 5, 1)
+        
         sweep_group.setLayout(param_layout)
         control_panel.addWidget(sweep_group)
         
@@ -181,10 +500,23 @@ class MPPTSweepApp(QWidget):
         self.save_data_button.clicked.connect(lambda: self.save_data_to_csv())
         action_layout.addWidget(self.save_data_button)
         
+        # Write each point to disk as it arrives (constant memory for very large sweeps)
+        self.stream_csv_check = QCheckBox("Stream Data to CSV During Sweep")
+        action_layout.addWidget(self.stream_csv_check)
+        
         self.save_plot_button = QPushButton("Save Plot")
         self.save_plot_button.clicked.connect(self.save_plot)
         action_layout.addWidget(self.save_plot_button)
         
+        # Plot export settings (higher DPI and a tight bounding box make saving slower)
+        plot_save_layout = QHBoxLayout()
+        plot_save_layout.addWidget(QLabel("Plot DPI:"))
+        self.plot_dpi_input = QLineEdit("150")
+        plot_save_layout.addWidget(self.plot_dpi_input)
+        self.tight_bbox_check = QCheckBox("Tight Bounding Box")
+        plot_save_layout.addWidget(self.tight_bbox_check)
+        action_layout.addLayout(plot_save_layout)
+        
         # Add simulation mode button
         self.sim_mode_button = QPushButton("Toggle Simulation Mode")
         self.sim_mode_button.clicked.connect(self.toggle_simulation_mode)
@@ -207,6 +539,9 @@ class MPPTSweepApp(QWidget):
         plot_panel.addWidget(self.toolbar)
         plot_panel.addWidget(self.canvas)
         
+        # Recapture the blit background whenever the canvas is fully redrawn
+        self.canvas.mpl_connect('draw_event', self.on_canvas_draw)
+        
         # Create initial empty plot
         self.create_initial_plot()
         
@@ -244,6 +579,7 @@ class MPPTSweepApp(QWidget):
         self.analysis_figure = Figure(figsize=(5, 8), dpi=100)
         self.analysis_canvas = FigureCanvas(self.analysis_figure)
         self.analysis_toolbar = NavigationToolbar(self.analysis_canvas, self)
+        self.analysis_ax1 = None  # Created on the first plot_analysis_data call
         
         analysis_layout.addWidget(self.analysis_toolbar)
         analysis_layout.addWidget(self.analysis_canvas)
@@ -314,11 +650,21 @@ class MPPTSweepApp(QWidget):
         # Also print to console for additional debugging
         print(f"[{timestamp}] {message}")
 
+    def _list_resources(self):
+        """Return the VISA resource list, reusing a result less than 2 seconds old."""
+        now = time.monotonic()
+        resources, stamp = self._rm_cache
+        if resources is not None and now - stamp < 2.0:
+            return resources
+        resources = self.rm.list_resources()
+        self._rm_cache = (resources, now)
+        return resources
+
     def refresh_resources(self):
         """Refresh the list of available VISA resources"""
         if self.rm:
             try:
-                self.available_resources = self.rm.list_resources()
+                self.available_resources = self._list_resources()
                 if self.available_resources:
                     self.resources_text.setText("\n".join(self.available_resources))
                     self.add_log(f"Resources refreshed: {len(self.available_resources)} found")
@@ -375,6 +721,10 @@ class MPPTSweepApp(QWidget):
 
     def toggle_simulation_mode(self):
         """Toggle between simulation mode and real hardware mode"""
+        if self.is_sweep_running():
+            QMessageBox.warning(self, "Sweep Running", "Cannot change mode while a sweep is running.")
+            return
+        
         self.simulation_mode = not self.simulation_mode
         
         if self.simulation_mode:
@@ -393,23 +743,108 @@ class MPPTSweepApp(QWidget):
             except Exception as e:
                 self.add_log(f"Error closing connection: {str(e)}")
 
-    def create_initial_plot(self):
-        """Create the initial empty plot."""
-        self.figure.clear()
+    def create_iv_axes(self, figure, title):
+        """Build twin I-V/P-V axes with empty line, MPP marker and label artists."""
+        figure.clear()
         
         # Create a figure with shared x-axis
-        self.ax1 = self.figure.add_subplot(111)
-        self.ax2 = self.ax1.twinx()
+        ax1 = figure.add_subplot(111)
+        ax2 = ax1.twinx()
+        
+        # Lines are created once and updated in place with set_data
+        line_iv, = ax1.plot([], [], '-', color=BLUE, marker='.', label="Current")
+        line_pv, = ax2.plot([], [], '-', color=RED, marker='.', label="Power")
+        
+        # MPP markers and label stay empty/hidden until an MPP is marked; the green
+        # square already marks the point, so the label needs no arrow
+        mpp_iv, = ax1.plot([], [], 's', color=GREEN, markersize=10, label="MPP")
+        mpp_pv, = ax2.plot([], [], 's', color=GREEN, markersize=10)
+        mpp_text = ax2.text(0, 0, "", color=GREEN, fontweight='bold', visible=False)
         
         # Labels
-        self.ax1.set_xlabel("Voltage (V)")
-        self.ax1.set_ylabel("Current (A)", color='blue')
-        self.ax2.set_ylabel("Power (W)", color='red')
+        ax1.set_xlabel("Voltage (V)")
+        ax1.set_ylabel("Current (A)", color=BLUE)
+        ax1.tick_params(axis='y', labelcolor=BLUE)
+        ax2.set_ylabel("Power (W)", color=RED)
+        ax2.tick_params(axis='y', labelcolor=RED)
         
-        self.ax1.set_title("I-V and P-V Curves")
+        # Add title, grid and legend
+        ax1.set_title(title)
+        ax1.grid(True)
+        ax1.legend([line_iv, mpp_iv, line_pv], ["Current", "MPP", "Power"], loc='upper right')
+        return ax1, ax2, line_iv, line_pv, mpp_iv, mpp_pv, mpp_text
+
+    def mark_mpp(self, mpp_iv, mpp_pv, mpp_text, mpp_voltage, mpp_current, max_power):
+        """Move the MPP markers and label to the given point."""
+        mpp_iv.set_data([mpp_voltage], [mpp_current])
+        mpp_pv.set_data([mpp_voltage], [max_power])
+        mpp_text.set_position((mpp_voltage, max_power*0.8))
+        mpp_text.set_text(f"MPP: {max_power:.3f}W @ {mpp_voltage:.3f}V")
+        mpp_text.set_visible(True)
+
+    def create_initial_plot(self):
+        """Create the initial empty plot."""
+        (self.ax1, self.ax2, self.line_iv, self.line_pv,
+         self.mpp_iv, self.mpp_pv, self.mpp_text) = self.create_iv_axes(self.figure, "I-V and P-V Curves")
+        # Tick labels change once real data arrives, so the layout stays dirty until then
         self.figure.tight_layout()
+        self._layout_dirty = True
         self.canvas.draw()
 
+    def start_live_plot(self, start, stop):
+        """Prepare the plot for blitted updates during a sweep."""
+        # Reuse the existing axes and artists, only clearing the previous results
+        for line in (self.line_iv, self.line_pv, self.mpp_iv, self.mpp_pv):
+            line.set_data([], [])
+        self.mpp_text.set_visible(False)
+        self.ax1.set_title("I-V and P-V Curves")
+        
+        # The voltage range is known up front, so only the y-axes need rescaling
+        if start != stop:
+            pad = 0.02 * abs(stop - start)
+            self.ax1.set_xlim(min(start, stop) - pad, max(start, stop) + pad)
+        
+        # Leave headroom on the y-axes so new points rarely force a full redraw
+        for ax in (self.ax1, self.ax2):
+            ax.set_ymargin(0.25)
+        
+        # Animated lines are left out of full redraws and blitted on top of the background
+        self.line_iv.set_animated(True)
+        self.line_pv.set_animated(True)
+        self._blitting = True
+        self._bg = None
+        self.canvas.draw_idle()
+
+    def stop_live_plot(self):
+        """Return the plot to normal (non-blitted) drawing after a sweep."""
+        self._blitting = False
+        self._bg = None
+        self.line_iv.set_animated(False)
+        self.line_pv.set_animated(False)
+        self.ax1.set_autoscalex_on(True)
+        for ax in (self.ax1, self.ax2):
+            ax.set_ymargin(plt.rcParams['axes.ymargin'])
+
+    def on_canvas_draw(self, event):
+        """Capture the background after a full redraw and paint the live lines on it."""
+        if not self._blitting:
+            return
+        self._bg = self.canvas.copy_from_bbox(self.figure.bbox)
+        self.ax1.draw_artist(self.line_iv)
+        self.ax2.draw_artist(self.line_pv)
+
+    def schedule_plot_update(self):
+        """Coalesce live plot updates to at most ~20 redraws per second."""
+        if not self._plot_pending:
+            self._plot_pending = True
+            QTimer.singleShot(50, self.flush_plot_update)
+
+    def flush_plot_update(self):
+        """Run the deferred live plot update."""
+        self._plot_pending = False
+        if self._blitting:
+            self.update_live_plot()
+
     def initialize_keithley(self):
         """Initialize the Keithley 2401 SMU using the GPIB address."""
         if self.simulation_mode:
@@ -440,6 +875,16 @@ class MPPTSweepApp(QWidget):
             self.keithley = self.rm.open_resource(resource_name)
             self.keithley.timeout = 20000  # 20 seconds timeout
             
+            # Tune the I/O path for bulk reads
+            self.keithley.chunk_size = 1024 * 1024  # Read large binary blocks in one call
+            self.keithley.write_termination = '\n'
+            self.keithley.send_end = True  # Assert EOI at the end of each message
+            self.keithley.query_delay = 0.0
+            # No read termination character: binary REAL,32 blocks may contain 0x0A
+            # bytes, so replies are delimited by EOI instead
+            self.keithley.read_termination = None
+            self.add_log(f"VISA chunk size set to {self.keithley.chunk_size} bytes")
+            
             # Reset the instrument
             self.add_log("Sending *RST to instrument")
             self.keithley.write("*RST")
@@ -480,6 +925,40 @@ class MPPTSweepApp(QWidget):
             QMessageBox.critical(self, "Error", f"Failed to initialize Keithley 2401: {str(e)}")
             self.status_label.setText(f"Error: {str(e)}")
 
+    def write_commands(self, cmds):
+        """Send SCPI commands as one chained write, falling back to one write per command.
+        
+        Raises RuntimeError if the instrument still reports an error after the fallback.
+        """
+        # Clear errors left over from earlier commands so only this setup is checked
+        self.keithley.write('*CLS')
+        self.keithley.write(';'.join(cmds))
+        
+        # Check the error queue; on a parse error resend the commands individually
+        error = self.keithley.query(':SYST:ERR?').strip()
+        if not error.startswith('0') and not error.startswith('+0'):
+            self.add_log(f"Chained setup reported '{error}', retrying commands one by one")
+            self.keithley.write('*CLS')
+            for cmd in cmds:
+                self.keithley.write(cmd)
+            
+            error = self.keithley.query(':SYST:ERR?').strip()
+            if not error.startswith('0') and not error.startswith('+0'):
+                raise RuntimeError(f"Instrument reported '{error}' during setup")
+
+    def use_onboard_sweep(self, points):
+        """Return True if the on-board sweep is selected and can run this many points."""
+        return (self.onboard_sweep_check.isChecked()
+                and ONBOARD_SWEEP_MIN_POINTS <= points <= ONBOARD_SWEEP_MAX_POINTS)
+
+    def estimate_point_time(self, delay):
+        """Estimate the instrument time per point from the source delay and NPLC.
+        
+        Autozero is off during the sweep (see setupIV), so it adds no time.
+        """
+        nplc = float(self.nplc_input.text().strip() or DEFAULT_NPLC)
+        return delay + nplc / LINE_FREQUENCY + POINT_OVERHEAD_SECONDS
+
     def setupIV(self):
         """Configure Keithley for I-V testing in voltage sweep mode."""
         if self.simulation_mode:
@@ -487,40 +966,95 @@ class MPPTSweepApp(QWidget):
             return True
             
         try:
+            # The whole configuration is collected and sent as a single GPIB transaction
+            cmds = []
+            
             # Always use voltage sweep mode for MPPT
-            self.keithley.write(':SOUR:FUNC VOLT')  # Source voltage
-            self.keithley.write(':SENS:FUNC "CURR"')  # Measure current
+            cmds.append(':SOUR:FUNC VOLT')  # Source voltage
+            cmds.append(':SENS:FUNC "CURR"')  # Measure current
             self.add_log("Set instrument to voltage source, current measure mode")
             
+            # Transfer readings as little-endian IEEE-754 floats instead of ASCII
+            cmds.append(':FORM:DATA REAL,32')
+            cmds.append(':FORM:BORD SWAP')
+            self.add_log("Set binary data format (REAL,32, swapped byte order)")
+            
             # Set sensing mode based on checkbox
             if self.four_wire_check.isChecked():
-                self.keithley.write(":SYST:RSEN ON")  # 4-wire mode
+                cmds.append(":SYST:RSEN ON")  # 4-wire mode
                 self.add_log("Enabled 4-wire sensing")
             else:
-                self.keithley.write(":SYST:RSEN OFF")  # 2-wire mode
+                cmds.append(":SYST:RSEN OFF")  # 2-wire mode
                 self.add_log("Using 2-wire sensing")
             
             # Always use front terminals (removed rear option as requested)
-            self.keithley.write(":ROUT:TERM FRONT")  # Front terminals
+            cmds.append(":ROUT:TERM FRONT")  # Front terminals
             self.add_log("Set to use front terminals")
             
             # Set the maximum current compliance limit
             max_current = self.max_current_input.text().strip()
             if max_current:
-                self.keithley.write(f":SENS:CURR:PROT {max_current}")  # Set current compliance
+                cmds.append(f":SENS:CURR:PROT {max_current}")  # Set current compliance
                 self.add_log(f"Set current compliance to {max_current}A")
             
+            # Program the staircase sweep on the instrument, or fixed mode for point-by-point
+            points = int(self.points_input.text())
+            if self.use_onboard_sweep(points):
+                start = float(self.start_voltage.text())
+                stop = float(self.stop_voltage.text())
+                cmds.append(f':SOUR:VOLT:STAR {start}')
+                cmds.append(f':SOUR:VOLT:STOP {stop}')
+                cmds.append(f':SOUR:SWE:POIN {points}')
+                cmds.append(':SOUR:VOLT:MODE SWE')
+                cmds.append(':SOUR:SWE:SPAC LIN')
+                cmds.append(':SOUR:SWE:RANG BEST')
+                cmds.append(f':TRIG:COUN {points}')
+                self.add_log(f"Programmed on-board sweep: {start}V to {stop}V, {points} points")
+            else:
+                if self.onboard_sweep_check.isChecked():
+                    self.add_log(f"On-board sweep supports {ONBOARD_SWEEP_MIN_POINTS}-{ONBOARD_SWEEP_MAX_POINTS} "
+                                 f"points, falling back to point-by-point for {points} points")
+                cmds.append(':SOUR:VOLT:MODE FIX')
+                cmds.append(':TRIG:COUN 1')
+                self.add_log("Using point-by-point sweep")
+            
             # Turn output ON
-            self.keithley.write(':OUTP ON')
+            cmds.append(':OUTP ON')
             self.add_log("Turned output ON")
             
+            # Hardware-timed settling before each measurement, for both sweep modes
+            delay = float(self.delay_input.text())
+            cmds.append(f':SOUR:DEL {delay}')
+            self.add_log(f"Set source delay to {delay}s")
+            
             # Zero the output initially
-            self.keithley.write(':SOUR:VOLT 0')
+            cmds.append(':SOUR:VOLT 0')
             self.add_log("Set initial voltage to 0V")
             
+            # Throughput settings: single measurement function, no display, no autozero
+            cmds.append(':SENS:FUNC:CONC OFF')
+            cmds.append(':DISP:ENAB OFF')
+            cmds.append(':SYST:AZER:STAT OFF')
+            self.add_log("Disabled concurrent measurements, display and autozero for speed")
+            
+            nplc = self.nplc_input.text().strip()
+            self._restore_nplc = None
+            if nplc:
+                # Remember the current integration time so it can be restored after the sweep
+                self._restore_nplc = self.keithley.query(':SENS:CURR:NPLC?').strip()
+                cmds.append(f':SENS:CURR:NPLC {nplc}')
+                self.add_log(f"Set current integration time to {nplc} NPLC")
+            
+            self.write_commands(cmds)
             return True
         except Exception as e:
             self.add_log(f"Error in setupIV: {str(e)}")
+            # The failed setup may already have turned the output on
+            try:
+                self.keithley.write(':OUTP OFF')
+                self.keithley.write(':DISP:ENAB ON')
+            except Exception:
+                pass
             QMessageBox.critical(self, "Setup Error", f"Failed to setup Keithley: {str(e)}")
             self.status_label.setText(f"Setup Error: {str(e)}")
             return False
@@ -531,182 +1065,198 @@ class MPPTSweepApp(QWidget):
             QMessageBox.warning(self, "Error", "Please initialize the Keithley first.")
             return
         
+        if self.is_sweep_running():
+            QMessageBox.warning(self, "Error", "A sweep is already running.")
+            return
+        
         try:
-            # Reset abort flag
-            self.abort_sweep = False
-            
             # Get sweep parameters
             start = float(self.start_voltage.text())
             stop = float(self.stop_voltage.text())
             points = int(self.points_input.text())
             delay = float(self.delay_input.text())
+            self.estimate_point_time(delay)  # Raises ValueError for a non-numeric NPLC
+            
+            # Check the inputs before setupIV turns the output on and changes the front panel
+            if points < 1 or delay < 0:
+                self.add_log(f"Input error in start_sweep: {points} points, {delay}s delay")
+                QMessageBox.warning(self, "Input Error",
+                                    "Number of points must be at least 1 and delay must not be negative.")
+                return
             
             self.add_log(f"Starting sweep: {start}V to {stop}V, {points} points, {delay}s delay")
             
+            # Pick the streaming target before the output is turned on
+            if self.stream_csv_check.isChecked() and not self.save_data_to_csv(streaming=True):
+                self.add_log("No streaming file selected, data will be kept in memory only")
+            
             # Setup the instrument for IV sweep
             if self.simulation_mode or self.setupIV():
                 # Perform the sweep
                 self.status_label.setText("Running sweep...")
                 self.voltage_sweep(start, stop, points, delay)
-                self.status_label.setText("Sweep completed.")
+            else:
+                self.close_data_stream()
             
         except ValueError as e:
+            self.close_data_stream()
             self.add_log(f"Input error in start_sweep: {str(e)}")
             QMessageBox.warning(self, "Input Error", "Please enter valid numeric values for all parameters.")
         except Exception as e:
+            self.close_data_stream()
             self.add_log(f"Error in start_sweep: {str(e)}")
             QMessageBox.critical(self, "Sweep Error", f"Error during sweep: {str(e)}")
             self.status_label.setText(f"Sweep Error: {str(e)}")
 
     def abort_sweep_func(self):
         """Abort the current sweep operation."""
-        self.abort_sweep = True
+        if self.sweep_worker:
+            self.sweep_worker.abort()
         self.add_log("User requested sweep abort")
         self.status_label.setText("Aborting sweep...")
 
     def voltage_sweep(self, start, stop, points, delay):
-        """Perform voltage sweep and measure current."""
-        sweep_values = np.linspace(start, stop, points)
-        self.voltages = []  # Clear previous data
-        self.currents = []
-        self.powers = []
-        
-        # Create progress tracking
-        total_points = len(sweep_values)
+        """Run the voltage sweep on a worker thread."""
+        # Very large sweeps (point-by-point or simulated; the on-board sweep stops at
+        # ONBOARD_SWEEP_MAX_POINTS) are stored as float32 to halve buffer memory.
+        # The instrument resolution (<= 6.5 digits) fits in single precision.
+        dtype = np.float32 if points > 10_000 else np.float64
+        self.voltages = np.empty(points, dtype=dtype)  # Clear previous data
+        self.currents = np.empty(points, dtype=dtype)
+        self.powers = np.empty(points, dtype=dtype)
+        self._n = 0
+        self.start_live_plot(start, stop)
+        
+        self.sweep_thread = QThread()
+        self.sweep_worker = SweepWorker(self.keithley, self.simulation_mode, start, stop, points, delay,
+                                        onboard_sweep=self.use_onboard_sweep(points),
+                                        restore_nplc=self._restore_nplc,
+                                        point_time=self.estimate_point_time(delay))
+        self.sweep_worker.moveToThread(self.sweep_thread)
+        
+        self.sweep_thread.started.connect(self.sweep_worker.run)
+        self.sweep_worker.sampleReady.connect(self.on_sample_ready)
+        self.sweep_worker.blockReady.connect(self.on_block_ready)
+        self.sweep_worker.logMessage.connect(self.add_log)
+        self.sweep_worker.finished.connect(self.on_sweep_finished)
+        self.sweep_worker.finished.connect(self.sweep_thread.quit)
+        self.sweep_thread.finished.connect(self.on_sweep_thread_finished)
+        
+        self.start_button.setEnabled(False)
+        self.progress_timer.start()
+        self.sweep_thread.start()
+
+    def is_sweep_running(self):
+        """Return True while a sweep worker thread is active."""
+        return self.sweep_thread is not None
+
+    def update_sweep_progress(self):
+        """Show the latest sweep progress; called by the progress timer."""
+        if not self.sweep_worker:
+            return
+        progress = self.sweep_worker.latest_progress()
+        if progress is None:
+            return
+        point, voltage = progress
+        self.status_label.setText(f"Sweeping: {point}/{self.sweep_worker.points} points. Voltage: {voltage:.3f} V")
+
+    def on_sample_ready(self, voltage, current, power):
+        """Store a data point received from the worker."""
+        idx = self._n
+        self.voltages[idx] = voltage
+        self.currents[idx] = current
+        self.powers[idx] = power
+        self._n = idx + 1
+        
+        if self._stream_writer:
+            self._stream_writer.writerow((voltage, current, power))
+        
+        # Request a (throttled) plot update with the new data point
+        self.schedule_plot_update()
+
+    def on_block_ready(self, voltages, currents, powers):
+        """Store a block of data points received from the worker."""
+        start, end = self._n, self._n + len(voltages)
+        self.voltages[start:end] = voltages
+        self.currents[start:end] = currents
+        self.powers[start:end] = powers
+        self._n = end
+        
+        if self._stream_writer:
+            self._stream_writer.writerows(zip(voltages.tolist(), currents.tolist(), powers.tolist()))
+        
+        self.schedule_plot_update()
+
+    def on_sweep_finished(self, aborted):
+        """Finalize the plot and results once the worker is done."""
+        self.progress_timer.stop()
+        self.close_data_stream()
         
-        for idx, voltage in enumerate(sweep_values):
-            if self.abort_sweep:
-                self.add_log("Sweep aborted by user")
-                QMessageBox.information(self, "Sweep Aborted", "The sweep was aborted.")
-                break
-            
-            try:
-                # Update status with progress
-                progress_msg = f"Sweeping: {idx+1}/{total_points} points. Voltage: {voltage:.3f} V"
-                self.status_label.setText(progress_msg)
-                if idx % 5 == 0:  # Log every 5th point to avoid excessive logging
-                    self.add_log(progress_msg)
-                QApplication.processEvents()  # Keep the UI responsive
-                
-                if self.simulation_mode:
-                    # In simulation mode, generate synthetic data
-                    # Simulate a solar cell I-V curve
-                    # Simple model: I = Isc * (1 - exp((V-Voc)/Vt))
-                    isc = 0.5  # Short circuit current
-                    voc = stop * 0.8  # Open circuit voltage
-                    vt = 0.6  # Thermal voltage
-                    
-                    if voltage >= voc:
-                        current = 0.0
-                    else:
-                        # Add some noise
-                        noise = np.random.normal(0, 0.01)
-                        current = isc * (1 - np.exp((voltage - voc) / vt)) + noise
-                        if current < 0:
-                            current = 0
-                    
-                    measured_voltage = voltage
-                    measured_current = current
-                    
-                    # Simulate measurement delay
-                    time.sleep(delay / 10)  # Faster in simulation
-                else:
-                    # Real hardware control
-                    # Set the source voltage
-                    self.keithley.write(f':SOUR:VOLT {voltage}')
-                    
-                    # Allow settling time
-                    time.sleep(delay)
-                    
-                    # Measure the values
-                    response = self.keithley.query(':READ?').strip()
-                    values = response.split(',')
-                    
-                    if len(values) >= 2:
-                        measured_voltage = float(values[0])
-                        measured_current = float(values[1]) * -1  # Invert current as requested
-                    else:
-                        raise ValueError("Invalid measurement response")
-                
-                # Calculate power
-                power = measured_voltage * measured_current
-                
-                # Store the data
-                self.voltages.append(measured_voltage)
-                self.currents.append(measured_current)
-                self.powers.append(power)
-                
-                # Update the plot with new data point
-                if idx % 3 == 0 or idx == total_points - 1:  # Update less frequently for better performance
-                    self.update_live_plot()
-                
-            except Exception as e:
-                error_msg = f"Error at voltage {voltage}: {str(e)}"
-                self.add_log(error_msg)
-                print(error_msg)
-                # Continue with the next point instead of stopping the whole sweep
-        
-        # Turn off output when done
-        if not self.simulation_mode:
-            try:
-                self.keithley.write(':SOUR:VOLT 0')  # Set voltage to zero first
-                self.keithley.write(':OUTP OFF')      # Turn off output
-                self.add_log("Sweep complete. Output turned OFF")
-            except Exception as e:
-                self.add_log(f"Error turning off output: {str(e)}")
+        if aborted:
+            self.add_log("Sweep aborted by user")
+            QMessageBox.information(self, "Sweep Aborted", "The sweep was aborted.")
         
         # Final plot update with all data
-        if len(self.voltages) > 0:
+        self.stop_live_plot()
+        if self._n > 0:
             self.update_live_plot()
             self.find_mppt_point()
-            self.add_log(f"Sweep completed with {len(self.voltages)} valid data points")
+            self.add_log(f"Sweep completed with {self._n} valid data points")
         else:
             self.add_log("Sweep completed but no valid data points were collected")
             QMessageBox.warning(self, "Sweep Error", "No valid data points were collected during the sweep.")
+        
+        self.status_label.setText("Sweep completed.")
+
+    def on_sweep_thread_finished(self):
+        """Release the worker thread once it has stopped."""
+        self.sweep_thread.wait()
+        self.sweep_thread = None
+        self.sweep_worker = None
+        self.start_button.setEnabled(True)
 
     def update_live_plot(self):
         """Update the plot with current data."""
-        if not self.voltages or not self.currents:
+        if self._n == 0:
             return
-            
-        self.figure.clear()
-        
-        # Create axes with shared x-axis
-        ax1 = self.figure.add_subplot(111)
-        ax2 = ax1.twinx()
-        
-        # Plot I-V curve (blue)
-        ax1.plot(self.voltages, self.currents, 'b-', marker='.', label="Current")
-        ax1.set_xlabel("Voltage (V)")
-        ax1.set_ylabel("Current (A)", color='blue')
-        ax1.tick_params(axis='y', labelcolor='blue')
-        
-        # Plot P-V curve (red) on secondary y-axis
-        ax2.plot(self.voltages, self.powers, 'r-', marker='.', label="Power")
-        ax2.set_ylabel("Power (W)", color='red')
-        ax2.tick_params(axis='y', labelcolor='red')
-        
-        # Add title and grid
-        ax1.set_title("I-V and P-V Curves")
-        ax1.grid(True)
         
-        # Add legend
-        lines1, labels1 = ax1.get_legend_handles_labels()
-        lines2, labels2 = ax2.get_legend_handles_labels()
-        ax1.legend(lines1 + lines2, labels1 + labels2, loc='upper right')
+        n = self._n
+        voltages, currents, powers = self.voltages[:n], self.currents[:n], self.powers[:n]
+        
+        self.line_iv.set_data(voltages, currents)
+        self.line_pv.set_data(voltages, powers)
+        
+        # Full redraw only when there is no background yet or the data left the view
+        if (not self._blitting or self._bg is None
+                or self.is_outside_view(self.ax1, currents) or self.is_outside_view(self.ax2, powers)):
+            for ax in (self.ax1, self.ax2):
+                ax.relim()
+                ax.autoscale_view()
+            # Stale until the idle redraw recaptures it in on_canvas_draw
+            self._bg = None
+            self.canvas.draw_idle()
+            return
         
-        self.figure.tight_layout()
-        self.canvas.draw()
+        # Blit only the changed lines on top of the cached background
+        self.canvas.restore_region(self._bg)
+        self.ax1.draw_artist(self.line_iv)
+        self.ax2.draw_artist(self.line_pv)
+        self.canvas.blit(self.figure.bbox)
+
+    def is_outside_view(self, ax, values):
+        """Return True if any value falls outside the current y-limits of the axes."""
+        low, high = ax.get_ylim()
+        return values.min() < low or values.max() > high
 
     def find_mppt_point(self):
         """Find and mark the Maximum Power Point."""
-        if not self.powers:
+        if self._n == 0:
             return
+        
+        n = self._n
+        voltages, currents, powers = self.voltages[:n], self.currents[:n], self.powers[:n]
             
-        max_power_idx = np.argmax(self.powers)
-        max_power = self.powers[max_power_idx]
-        mpp_voltage = self.voltages[max_power_idx]
-        mpp_current = self.currents[max_power_idx]
+        _, mpp_voltage, mpp_current, max_power = _mpp(voltages, currents, powers)
         
         # Log MPP data
         self.add_log(f"MPP found: Voltage={mpp_voltage:.3f}V, Current={mpp_current:.3f}A, Power={max_power:.3f}W")
@@ -714,117 +1264,198 @@ class MPPTSweepApp(QWidget):
         # Update the status label
         self.status_label.setText(f"MPP: Voltage={mpp_voltage:.3f}V, Current={mpp_current:.3f}A, Power={max_power:.3f}W")
         
-        # Highlight the MPP on the plot
-        self.figure.clear()
+        # Highlight the MPP on the existing axes
+        self.mark_mpp(self.mpp_iv, self.mpp_pv, self.mpp_text, mpp_voltage, mpp_current, max_power)
         
-        # Create axes with shared x-axis
-        ax1 = self.figure.add_subplot(111)
-        ax2 = ax1.twinx()
-                # Plot I-V curve (blue)
-        ax1.plot(self.voltages, self.currents, 'b-', marker='.', label="Current")
-        ax1.set_xlabel("Voltage (V)")
-        ax1.set_ylabel("Current (A)", color='blue')
-        ax1.tick_params(axis='y', labelcolor='blue')
-        
-        # Plot P-V curve (red) on secondary y-axis
-        ax2.plot(self.voltages, self.powers, 'r-', marker='.', label="Power")
-        ax2.set_ylabel("Power (W)", color='red')
-        ax2.tick_params(axis='y', labelcolor='red')
-        
-        # Mark the MPP
-        ax1.plot(mpp_voltage, mpp_current, 'gs', markersize=10, label="MPP")
-        ax2.plot(mpp_voltage, max_power, 'gs', markersize=10)
-        
-        # Add annotations
-        ax2.annotate(f"MPP: {max_power:.3f}W @ {mpp_voltage:.3f}V",
-                     xy=(mpp_voltage, max_power),
-                     xytext=(mpp_voltage, max_power*0.8),
-                     arrowprops=dict(facecolor='green', shrink=0.05),
-                     color='green',
-                     fontweight='bold')
-        
-        # Add title and grid
-        ax1.set_title("I-V and P-V Curves with Maximum Power Point")
-        ax1.grid(True)
+        # Update title (one line like the sweep title, so the layout is unaffected)
+        self.ax1.set_title("I-V and P-V Curves with Maximum Power Point")
         
-        # Add legend
-        lines1, labels1 = ax1.get_legend_handles_labels()
-        lines2, labels2 = ax2.get_legend_handles_labels()
-        ax1.legend(lines1 + lines2, labels1 + labels2, loc='upper right')
+        for ax in (self.ax1, self.ax2):
+            ax.relim()
+            ax.autoscale_view()
         
-        self.figure.tight_layout()
-        self.canvas.draw()
+        if self._layout_dirty:
+            self.figure.tight_layout()
+            self._layout_dirty = False
+        self.canvas.draw_idle()
+
+    def _data(self):
+        """Return the valid data points as an (N, 3) array of voltage, current and power."""
+        n = self._n
+        return np.column_stack((self.voltages[:n], self.currents[:n], self.powers[:n]))
+
+    def get_sweep_params(self):
+        """Return the sweep parameters to save alongside the data."""
+        return {
+            'Start_Voltage': self.start_voltage.text(),
+            'Stop_Voltage': self.stop_voltage.text(),
+            'Points': self.points_input.text(),
+            'Delay': self.delay_input.text(),
+            'Max_Current': self.max_current_input.text(),
+            'Four_Wire': str(self.four_wire_check.isChecked()),
+            'Measurement_Date': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'Simulation_Mode': str(self.simulation_mode)
+        }
 
-    def save_data_to_csv(self):
-        """Save the data to a CSV file."""
-        if not self.voltages or not self.currents:
+    def get_file_path(self, key, title, filters, save=True):
+        """Show the cached file dialog for key and return (file path, selected filter).
+        
+        Each purpose keeps one dialog, created on first use, so later calls keep
+        its directory, filter and sort order. Returns ("", "") if cancelled.
+        """
+        dialog = self._file_dialogs.get(key)
+        if dialog is None:
+            dialog = QFileDialog(self, title, self._last_dir, filters)
+            dialog.setAcceptMode(QFileDialog.AcceptSave if save else QFileDialog.AcceptOpen)
+            if not save:
+                dialog.setFileMode(QFileDialog.ExistingFile)
+            # Skip per-file icon lookups, which stat every entry on slow/network filesystems
+            dialog.setOption(QFileDialog.DontUseCustomDirectoryIcons)
+            self._file_dialogs[key] = dialog
+        
+        if not dialog.exec_():
+            return "", ""
+        file_path = dialog.selectedFiles()[0]
+        self._last_dir = os.path.dirname(file_path)
+        return file_path, dialog.selectedNameFilter()
+
+    def save_data_to_csv(self, streaming=False):
+        """Save the data to a CSV file.
+        
+        With streaming=True the file is only opened here; each point is then
+        written as it arrives during the sweep and the file is closed at the end.
+        Returns True if a file was written or opened.
+        """
+        if not streaming and self._n == 0:
             QMessageBox.warning(self, "No Data", "No data available to save.")
-            return
+            return False
             
         try:
-            options = QFileDialog.Options()
-            file_path, _ = QFileDialog.getSaveFileName(
-                self, 
-                "Save Data", 
-                "", 
-                "CSV Files (*.csv);;All Files (*)", 
-                options=options
+            # Streaming always writes CSV; a full save can use any supported format
+            filters = [DATA_FILE_FILTERS['.csv']] if streaming else list(DATA_FILE_FILTERS.values())
+            file_path, selected_filter = self.get_file_path(
+                'stream_data' if streaming else 'save_data',
+                "Stream Data" if streaming else "Save Data", 
+                ";;".join(filters + ["All Files (*)"])
             )
             
             if file_path:
+                # Add the extension of the selected format if none was typed
+                ext = os.path.splitext(file_path)[1].lower()
+                if ext not in DATA_FILE_FILTERS or streaming:
+                    ext = next((e for e, f in DATA_FILE_FILTERS.items() if f == selected_filter), '.csv')
+                    if not file_path.lower().endswith(ext):
+                        file_path += ext
+                
                 # Get sweep parameters to save with data
-                sweep_params = {
-                    'Start_Voltage': self.start_voltage.text(),
-                    'Stop_Voltage': self.stop_voltage.text(),
-                    'Points': self.points_input.text(),
-                    'Delay': self.delay_input.text(),
-                    'Max_Current': self.max_current_input.text(),
-                    'Four_Wire': str(self.four_wire_check.isChecked()),
-                    'Measurement_Date': time.strftime("%Y-%m-%d %H:%M:%S"),
-                    'Simulation_Mode': str(self.simulation_mode)
-                }
+                sweep_params = self.get_sweep_params()
                 
-                # Create DataFrame for data
-                data = {
-                    'Voltage (V)': self.voltages,
-                    'Current (A)': self.currents,
-                    'Power (W)': self.powers
-                }
-                df = pd.DataFrame(data)
+                if ext in ('.feather', '.parquet'):
+                    # Parameters are stored in the file itself as schema metadata
+                    n = self._n
+                    table = pa.table(dict(zip(DATA_COLUMNS, (self.voltages[:n], self.currents[:n],
+                                                             self.powers[:n]))))
+                    table = table.replace_schema_metadata({'sweep_params': json.dumps(sweep_params)})
+                    if ext == '.feather':
+                        feather.write_feather(table, file_path)
+                    else:
+                        pq.write_table(table, file_path, compression='zstd')
+                elif ext == '.h5':
+                    # Data and parameters go into one compressed file, params as node attributes
+                    df = pd.DataFrame(self._data(), columns=DATA_COLUMNS)
+                    with pd.HDFStore(file_path, 'w', complevel=5, complib='blosc') as store:
+                        store.put('data', df, format='fixed')
+                        store.get_storer('data').attrs.params = sweep_params
                 
-                # Save DataFrame to CSV
-                df.to_csv(file_path, index=False)
+                if ext in ('.feather', '.parquet', '.h5'):
+                    self.add_log(f"Data and parameters saved to {file_path}")
+                    QMessageBox.information(self, "Success", f"Data and parameters saved to {file_path}")
+                    return True
                 
-                # Save parameters as a second file
-                param_file = file_path.replace('.csv', '_params.csv')
-                pd.DataFrame([sweep_params]).to_csv(param_file, index=False)
+                if streaming:
+                    # Open the file once; rows are appended by the sample slots
+                    self._stream_file = open(file_path, 'w', newline='')
+                    self._stream_writer = csv.writer(self._stream_file)
+                    self._stream_writer.writerow(DATA_COLUMNS)
+                    self.add_log(f"Streaming data to {file_path}")
+                else:
+                    # Write the rows straight from the data block
+                    with open(file_path, 'w', newline='') as f:
+                        writer = csv.writer(f)
+                        writer.writerow(DATA_COLUMNS)
+                        writer.writerows(self._data().tolist())
+                    self.add_log(f"Data saved to {file_path}")
                 
-                self.add_log(f"Data saved to {file_path}")
+                # Save parameters as a second file (header row plus one value row)
+                param_file = file_path.replace('.csv', '_params.csv')
+                with open(param_file, 'w', newline='') as f:
+                    writer = csv.writer(f)
+                    writer.writerow(sweep_params.keys())
+                    writer.writerow(sweep_params.values())
                 self.add_log(f"Parameters saved to {param_file}")
-                QMessageBox.information(self, "Success", f"Data saved to {file_path}\nParameters saved to {param_file}")
+                
+                if not streaming:
+                    QMessageBox.information(self, "Success", f"Data saved to {file_path}\nParameters saved to {param_file}")
+                return True
                 
         except Exception as e:
+            self.close_data_stream()
             self.add_log(f"Error saving data: {str(e)}")
             QMessageBox.critical(self, "Save Error", f"Error saving data: {str(e)}")
+        return False
+
+    def close_data_stream(self):
+        """Close the streaming CSV file, if one is open."""
+        if not self._stream_file:
+            return
+        try:
+            self._stream_file.close()
+            self.add_log(f"Data stream closed: {self._stream_file.name}")
+        except Exception as e:
+            self.add_log(f"Error closing data stream: {str(e)}")
+        self._stream_file = None
+        self._stream_writer = None
 
     def save_plot(self):
         """Save the current plot as an image file."""
-        if not self.voltages or not self.currents:
+        if self._n == 0:
             QMessageBox.warning(self, "No Data", "No plot available to save.")
             return
             
         try:
-            options = QFileDialog.Options()
-            file_path, _ = QFileDialog.getSaveFileName(
-                self, 
+            try:
+                dpi = float(self.plot_dpi_input.text())
+            except ValueError:
+                QMessageBox.warning(self, "Invalid DPI", "Plot DPI must be a number.")
+                return
+            
+            file_path, selected_filter = self.get_file_path(
+                'save_plot',
                 "Save Plot", 
-                "", 
-                "PNG Files (*.png);;PDF Files (*.pdf);;All Files (*)", 
-                options=options
+                "PNG Files (*.png);;PDF Files (*.pdf);;All Files (*)"
             )
             
             if file_path:
-                self.figure.savefig(file_path, dpi=300, bbox_inches='tight')
+                # Pass the format explicitly instead of letting matplotlib infer it
+                ext = os.path.splitext(file_path)[1].lower()
+                if not ext:
+                    ext = '.pdf' if selected_filter.startswith("PDF") else '.png'
+                    file_path += ext
+                fmt = ext[1:]
+                
+                if (fmt == 'png' and PIL_AVAILABLE
+                        and not self.tight_bbox_check.isChecked() and not self._blitting):
+                    # Render once at the requested DPI and encode the buffer directly
+                    Image.fromarray(self.render_rgba(dpi)).save(
+                        file_path, format='PNG', compress_level=1, optimize=False)
+                else:
+                    kwargs = {}
+                    # tight_layout already ran, so the extra tight-bbox render pass is opt-in
+                    if self.tight_bbox_check.isChecked():
+                        kwargs['bbox_inches'] = 'tight'
+                    if fmt == 'pdf':
+                        kwargs['metadata'] = {'CreationDate': None}  # Skip the timestamp
+                    self.figure.savefig(file_path, dpi=dpi, format=fmt, **kwargs)
                 self.add_log(f"Plot saved to {file_path}")
                 QMessageBox.information(self, "Success", f"Plot saved to {file_path}")
                 
@@ -832,67 +1463,104 @@ class MPPTSweepApp(QWidget):
             self.add_log(f"Error saving plot: {str(e)}")
             QMessageBox.critical(self, "Save Error", f"Error saving plot: {str(e)}")
 
+    def render_rgba(self, dpi):
+        """Render the figure at the given DPI into an offscreen Agg buffer, as an RGBA array."""
+        agg_canvas = FigureCanvasAgg(self.figure)  # Temporarily becomes the figure's canvas
+        original_dpi = self.figure.dpi
+        try:
+            self.figure.dpi = dpi
+            agg_canvas.draw()
+            return np.asarray(agg_canvas.buffer_rgba())
+        finally:
+            self.figure.dpi = original_dpi
+            self.figure.set_canvas(self.canvas)
+
     def load_data_from_csv(self):
-        """Load data from a previously saved CSV file."""
+        """Load data from a previously saved CSV, Feather, Parquet or HDF5 file."""
+        # Loading replaces the buffers the running sweep is still writing into
+        if self.is_sweep_running():
+            QMessageBox.warning(self, "Sweep Running", "Cannot load data while a sweep is running.")
+            return
+        
         try:
-            options = QFileDialog.Options()
-            file_path, _ = QFileDialog.getOpenFileName(
-                self, 
+            file_path, _ = self.get_file_path(
+                'load_data',
                 "Load Data", 
-                "", 
-                "CSV Files (*.csv);;All Files (*)", 
-                options=options
+                ";;".join(list(DATA_FILE_FILTERS.values()) + ["All Files (*)"]),
+                save=False
             )
             
             if file_path:
                 self.add_log(f"Loading data from {file_path}")
+                ext = os.path.splitext(file_path)[1].lower()
                 
-                # Load the data file
-                df = pd.read_csv(file_path)
+                if ext in ('.feather', '.parquet'):
+                    if not PYARROW_AVAILABLE:
+                        raise RuntimeError(f"pyarrow is required to read {ext} files")
+                    table = feather.read_table(file_path) if ext == '.feather' else pq.read_table(file_path)
+                    columns = table.column_names
+                elif ext == '.h5':
+                    with pd.HDFStore(file_path, 'r') as store:
+                        df = store.get('data')
+                        params = getattr(store.get_storer('data').attrs, 'params', None)
+                    columns = list(df.columns)
+                else:
+                    # Read the header to check if this is the data file or parameters file
+                    with open(file_path, newline='') as f:
+                        columns = f.readline().strip().split(',')
                 
-                # Check if this is the data file or parameters file
-                if 'Voltage (V)' in df.columns:
-                    self.voltages = df['Voltage (V)'].tolist()
-                    self.currents = df['Current (A)'].tolist()
-                    self.powers = df['Power (W)'].tolist()
-                    
-                    # Try to load the corresponding parameters file
-                    param_file = file_path.replace('.csv', '_params.csv')
-                    if not param_file.endswith('_params.csv'):
+                if 'Voltage (V)' in columns:
+                    if ext in ('.feather', '.parquet'):
+                        self.voltages, self.currents = (table.column(col).to_numpy() for col in DATA_COLUMNS[:2])
+                        self._n = table.num_rows
+                        
+                        # Parameters are embedded in the schema metadata
+                        metadata = table.schema.metadata or {}
+                        if b'sweep_params' in metadata:
+                            self.add_log("Loading parameters stored in the data file")
+                            self.apply_loaded_params(json.loads(metadata[b'sweep_params']))
+                        else:
+                            self.add_log("No parameters stored in file. Only data loaded.")
+                            self.info_label.setText("No parameters stored in file. Only data loaded.")
+                    elif ext == '.h5':
+                        self.voltages, self.currents = (df[col].to_numpy() for col in DATA_COLUMNS[:2])
+                        self._n = len(df)
+                        
+                        # Parameters are stored as attributes of the data node
+                        if params is not None:
+                            self.add_log("Loading parameters stored in the data file")
+                            self.apply_loaded_params(params)
+                        else:
+                            self.add_log("No parameters stored in file. Only data loaded.")
+                            self.info_label.setText("No parameters stored in file. Only data loaded.")
+                    else:
+                        # Fixed dtypes skip type inference; very large files are read in chunks
+                        read_kwargs = dict(dtype=_LOAD_DTYPES, engine='c', usecols=list(_LOAD_DTYPES))
+                        if os.path.getsize(file_path) > CSV_CHUNK_BYTES:
+                            data = np.concatenate([chunk[list(_LOAD_DTYPES)].to_numpy() for chunk in
+                                                   pd.read_csv(file_path, chunksize=CSV_CHUNK_ROWS, **read_kwargs)])
+                        else:
+                            data = pd.read_csv(file_path, **read_kwargs)[list(_LOAD_DTYPES)].to_numpy()
+                        self.voltages, self.currents = data.T.copy()
+                        self._n = len(data)
+                        
+                        # Try to load the corresponding parameters file
                         param_file = file_path.replace('.csv', '_params.csv')
+                        try:
+                            if os.path.exists(param_file):
+                                self.add_log(f"Loading parameters from {param_file}")
+                                param_df = pd.read_csv(param_file)
+                                self.apply_loaded_params(param_df.iloc[0].to_dict())
+                            else:
+                                self.add_log("Parameter file not found. Only data loaded.")
+                                self.info_label.setText("Parameter file not found. Only data loaded.")
+                        except Exception as pe:
+                            self.add_log(f"Error loading parameters: {str(pe)}")
+                            self.info_label.setText(f"Error loading parameters: {str(pe)}")
                     
-                    try:
-                        if os.path.exists(param_file):
-                            self.add_log(f"Loading parameters from {param_file}")
-                            param_df = pd.read_csv(param_file)
-                            param_str = "Measurement Parameters:\n"
-                            for col in param_df.columns:
-                                param_str += f"{col}: {param_df[col][0]}\n"
-                            self.info_label.setText(param_str)
-                            
-                            # Update UI fields with loaded parameters if available
-                            try:
-                                if 'Start_Voltage' in param_df.columns:
-                                    self.start_voltage.setText(str(param_df['Start_Voltage'][0]))
-                                if 'Stop_Voltage' in param_df.columns:
-                                    self.stop_voltage.setText(str(param_df['Stop_Voltage'][0]))
-                                if 'Points' in param_df.columns:
-                                    self.points_input.setText(str(param_df['Points'][0]))
-                                if 'Delay' in param_df.columns:
-                                    self.delay_input.setText(str(param_df['Delay'][0]))
-                                if 'Max_Current' in param_df.columns:
-                                    self.max_current_input.setText(str(param_df['Max_Current'][0]))
-                                if 'Four_Wire' in param_df.columns:
-                                    self.four_wire_check.setChecked(param_df['Four_Wire'][0].lower() == 'true')
-                            except Exception as ue:
-                                self.add_log(f"Non-critical error updating UI from parameters: {str(ue)}")
-                                
-                        else:
-                            self.add_log("Parameter file not found. Only data loaded.")
-                            self.info_label.setText("Parameter file not found. Only data loaded.")
-                    except Exception as pe:
-                        self.add_log(f"Error loading parameters: {str(pe)}")
-                        self.info_label.setText(f"Error loading parameters: {str(pe)}")
+                    # Power is derived from V and I in one vectorized multiply, so files
+                    # without a power column (e.g. from sweep.py) load as well
+                    self.powers = self.voltages * self.currents
                     
                     # Plot the loaded data in the analysis tab
                     self.plot_analysis_data()
@@ -909,61 +1577,73 @@ class MPPTSweepApp(QWidget):
             self.add_log(f"Error loading data: {str(e)}")
             QMessageBox.critical(self, "Load Error", f"Error loading data: {str(e)}")
 
+    def apply_loaded_params(self, params):
+        """Show loaded measurement parameters and copy them into the sweep inputs."""
+        param_str = "Measurement Parameters:\n"
+        for key, value in params.items():
+            param_str += f"{key}: {value}\n"
+        self.info_label.setText(param_str)
+        
+        # Update UI fields with loaded parameters if available
+        try:
+            if 'Start_Voltage' in params:
+                self.start_voltage.setText(str(params['Start_Voltage']))
+            if 'Stop_Voltage' in params:
+                self.stop_voltage.setText(str(params['Stop_Voltage']))
+            if 'Points' in params:
+                self.points_input.setText(str(params['Points']))
+            if 'Delay' in params:
+                self.delay_input.setText(str(params['Delay']))
+            if 'Max_Current' in params:
+                self.max_current_input.setText(str(params['Max_Current']))
+            if 'Four_Wire' in params:
+                self.four_wire_check.setChecked(str(params['Four_Wire']).lower() == 'true')
+        except Exception as ue:
+            self.add_log(f"Non-critical error updating UI from parameters: {str(ue)}")
+
     def plot_analysis_data(self):
         """Plot the loaded data in the analysis tab."""
-        if not self.voltages or not self.currents:
+        if self._n == 0:
             return
-            
-        self.analysis_figure.clear()
         
-        # Create axes with shared x-axis
-        ax1 = self.analysis_figure.add_subplot(111)
-        ax2 = ax1.twinx()
-        
-        # Plot I-V curve (blue)
-        ax1.plot(self.voltages, self.currents, 'b-', marker='.', label="Current")
-        ax1.set_xlabel("Voltage (V)")
-        ax1.set_ylabel("Current (A)", color='blue')
-        ax1.tick_params(axis='y', labelcolor='blue')
+        n = self._n
+        voltages, currents, powers = self.voltages[:n], self.currents[:n], self.powers[:n]
+            
+        # Axes and artists are built on the first plot and reused afterwards
+        if self.analysis_ax1 is None:
+            (self.analysis_ax1, self.analysis_ax2, self.analysis_line_iv, self.analysis_line_pv,
+             self.analysis_mpp_iv, self.analysis_mpp_pv, self.analysis_mpp_text) = self.create_iv_axes(
+                self.analysis_figure, "Loaded I-V and P-V Curves with Maximum Power Point")
+            self._analysis_layout_dirty = True
         
-        # Plot P-V curve (red) on secondary y-axis
-        ax2.plot(self.voltages, self.powers, 'r-', marker='.', label="Power")
-        ax2.set_ylabel("Power (W)", color='red')
-        ax2.tick_params(axis='y', labelcolor='red')
+        # Plot I-V curve (blue) and P-V curve (red) on secondary y-axis
+        self.analysis_line_iv.set_data(voltages, currents)
+        self.analysis_line_pv.set_data(voltages, powers)
         
         # Find and mark the MPP
-        max_power_idx = np.argmax(self.powers)
-        max_power = self.powers[max_power_idx]
-        mpp_voltage = self.voltages[max_power_idx]
-        mpp_current = self.currents[max_power_idx]
-        
-        # Mark the MPP
-        ax1.plot(mpp_voltage, mpp_current, 'gs', markersize=10, label="MPP")
-        ax2.plot(mpp_voltage, max_power, 'gs', markersize=10)
-        
-        # Add annotations
-        ax2.annotate(f"MPP: {max_power:.3f}W @ {mpp_voltage:.3f}V",
-                     xy=(mpp_voltage, max_power),
-                     xytext=(mpp_voltage, max_power*0.8),
-                     arrowprops=dict(facecolor='green', shrink=0.05),
-                     color='green',
-                     fontweight='bold')
-        
-        # Add title and grid
-        ax1.set_title("Loaded I-V and P-V Curves with Maximum Power Point")
-        ax1.grid(True)
-        
-        # Add legend
-        lines1, labels1 = ax1.get_legend_handles_labels()
-        lines2, labels2 = ax2.get_legend_handles_labels()
-        ax1.legend(lines1 + lines2, labels1 + labels2, loc='upper right')
-        
-        self.analysis_figure.tight_layout()
-        self.analysis_canvas.draw()
+        _, mpp_voltage, mpp_current, max_power = _mpp(voltages, currents, powers)
+        self.mark_mpp(self.analysis_mpp_iv, self.analysis_mpp_pv, self.analysis_mpp_text,
+                      mpp_voltage, mpp_current, max_power)
+        
+        for ax in (self.analysis_ax1, self.analysis_ax2):
+            ax.relim()
+            ax.autoscale_view()
+        
+        if self._analysis_layout_dirty:
+            self.analysis_figure.tight_layout()
+            self._analysis_layout_dirty = False
+        self.analysis_canvas.draw_idle()
         self.add_log("Analysis plot updated with loaded data")
 
     def closeEvent(self, event):
         """Handle application close event."""
+        # Stop a running sweep before releasing the instrument
+        if self.is_sweep_running():
+            self.sweep_worker.abort()
+            self.sweep_thread.quit()
+            self.sweep_thread.wait()
+        self.close_data_stream()
+        
         try:
             if self.keithley:
                 self.add_log("Closing application - turning off output and closing connection")
@@ -1,4 +1,5 @@
 import sys
+import os
 import pyvisa
 import time
 import numpy as np
@@ -15,11 +16,113 @@ from PyQt5.QtWidgets import (
     QRadioButton,
     QButtonGroup,
     QMessageBox,
-    QFileDialog
+    QFileDialog,
+    QCheckBox
 )
+from PyQt5.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
 import pandas as pd
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas, NavigationToolbar2QT as NavigationToolbar
 
+# Points per instrument-side sweep; abort is checked between chunks
+SWEEP_CHUNK_POINTS = 100
+# :SOUR:SWE:POIN does not accept fewer points than this
+SWEEP_MIN_POINTS = 2
+# Longest time one chunk may keep the instrument busy, so abort stays responsive
+SWEEP_CHUNK_SECONDS = 1.0
+
+# Per-point timing estimate: integration time is NPLC / line frequency (50 Hz, the slower
+# mains, so the estimate errs long), about 3x with autozero on, plus fixed overhead
+LINE_FREQUENCY = 50.0
+AUTOZERO_FACTOR = 3.0
+POINT_OVERHEAD_SECONDS = 0.05
+DEFAULT_NPLC = 1.0  # Used when the NPLC field is empty (the *RST setting)
+
+class SweepWorker(QObject):
+    """Run the chunked instrument sweep off the GUI thread."""
+    readingsReady = pyqtSignal(object, object)  # voltage, current arrays of one chunk
+    error = pyqtSignal(str)
+    finished = pyqtSignal(bool)  # True if the sweep was aborted
+
+    def __init__(self, keithley, source, start, stop, points, point_time, debug=False,
+                 restore_nplc=None):
+        super().__init__()
+        self.keithley = keithley
+        self.source = source
+        self.start = start
+        self.stop = stop
+        self.points = points
+        self.point_time = point_time  # Estimated instrument seconds per point
+        self.restore_nplc = restore_nplc  # (current, voltage) NPLC to put back after the sweep
+        self.abort = False  # Set from the GUI thread, checked between chunks
+
+        # Per-point readings are only logged in debug mode, and written out once at the end
+        self._debug = debug
+        self._log_buf = []
+
+    @pyqtSlot()
+    def run(self):
+        """Perform I-V sweep."""
+        sweep_values = np.linspace(self.start, self.stop, self.points)
+        timeout = self.keithley.timeout
+
+        # Delay and integration are timed by the instrument, so size chunks to the point time
+        chunk_points = max(SWEEP_MIN_POINTS,
+                           min(SWEEP_CHUNK_POINTS, int(SWEEP_CHUNK_SECONDS / self.point_time)))
+
+        # Chunk boundaries; a remainder below the sweep minimum is folded into the previous chunk
+        bounds = list(range(0, self.points, chunk_points)) + [self.points]
+        if len(bounds) > 2 and bounds[-1] - bounds[-2] < SWEEP_MIN_POINTS:
+            del bounds[-2]
+
+        # Each chunk is one instrument-side sweep read back with a single binary :READ?
+        aborted = False
+        try:
+            for chunk_start, chunk_stop in zip(bounds[:-1], bounds[1:]):
+                if self.abort:
+                    aborted = True
+                    break
+
+                chunk = sweep_values[chunk_start:chunk_stop]
+                if len(chunk) < SWEEP_MIN_POINTS:
+                    # Only a one-point sweep gets here; source it as a fixed level
+                    self.keithley.write(f':SOUR:{self.source}:MODE FIX')
+                    self.keithley.write(f':SOUR:{self.source} {chunk[0]}')
+                else:
+                    self.keithley.write(f':SOUR:{self.source}:STAR {chunk[0]}')
+                    self.keithley.write(f':SOUR:{self.source}:STOP {chunk[-1]}')
+                    self.keithley.write(f':SOUR:SWE:POIN {len(chunk)}')
+                self.keithley.write(f':TRIG:COUN {len(chunk)}')
+
+                # The reading only comes back once the whole chunk has been swept
+                self.keithley.timeout = max(timeout, int(len(chunk) * self.point_time * 1000) + 5000)
+
+                raw = self.keithley.query_binary_values(':READ?', datatype='f', is_big_endian=False,
+                                                        container=np.ndarray)
+                readings = raw.reshape(-1, 2)  # Voltage, current per point
+                if self._debug:
+                    for value, voltage, current in zip(chunk, readings[:, 0], readings[:, 1]):
+                        self._log_buf.append(f"Set Value: {value:.10f}, Voltage: {voltage:.6f} V, "
+                                             f"Current: {current:.10f} A")
+
+                self.readingsReady.emit(readings[:, 0].copy(), -readings[:, 1])
+        except Exception as e:
+            self.error.emit(f"Error during sweep: {str(e)}")
+        finally:
+            # Always turn the output off and report back, so the GUI can start a new sweep
+            try:
+                self.keithley.timeout = timeout
+                self.keithley.write(':OUTP OFF')  # Turn output off
+                self.keithley.write(':SYST:AZER:STAT ON')  # Restore autozero
+                if self.restore_nplc:
+                    self.keithley.write(f':SENS:CURR:NPLC {self.restore_nplc[0]}')
+                    self.keithley.write(f':SENS:VOLT:NPLC {self.restore_nplc[1]}')
+            except Exception as e:
+                self.error.emit(f"Error turning off output: {str(e)}")
+            if self._log_buf:
+                sys.stdout.write('\n'.join(self._log_buf) + '\n')
+                self._log_buf.clear()
+            self.finished.emit(aborted)
+
 class SweepApp(QWidget):
     def __init__(self):
         super().__init__()
@@ -27,7 +130,12 @@ class SweepApp(QWidget):
         # Initialize GPIB communication
         self.rm = pyvisa.ResourceManager()
         self.keithley = None
-        self.abort_sweep = False
+        self._debug = '--debug' in sys.argv  # Log every reading to stdout after each sweep
+        self._last_dir = ""  # Directory of the last file dialog selection
+        self._restore_nplc = None  # NPLC read back in setupIV, restored after the sweep
+        self._file_dialogs = {}  # Reused QFileDialog per purpose, see get_file_path
+        self.sweep_thread = None
+        self.sweep_worker = None
 
         self.initUI()
 
@@ -118,6 +226,16 @@ class SweepApp(QWidget):
         layout.addWidget(self.max_voltage_label)
         layout.addWidget(self.max_voltage_input)
 
+        # Integration time (lower NPLC = faster but noisier readings)
+        self.nplc_label = QLabel("NPLC")
+        self.nplc_input = QLineEdit("0.1", self)
+        layout.addWidget(self.nplc_label)
+        layout.addWidget(self.nplc_input)
+
+        # Autozero re-measures the reference on every reading; off is faster
+        self.autozero_check = QCheckBox("Autozero", self)
+        layout.addWidget(self.autozero_check)
+
         # Buttons
         self.start_button = QPushButton("Start Sweep")
         self.start_button.clicked.connect(self.start_sweep)
@@ -136,6 +254,18 @@ class SweepApp(QWidget):
         self.plot_layout.addWidget(self.canvas)
         layout.addLayout(self.plot_layout)
 
+        # Axes and line are created once and updated in place while sweeping.
+        # During a sweep the line is animated: full redraws leave it out and it is blitted on top.
+        self._ax = self.figure.add_subplot(111)
+        self._line, = self._ax.plot([], [], marker='.', linestyle='-')
+        self._ax.set_xlabel("Voltage (V)")
+        self._ax.set_ylabel("Current (A)")
+        self._last_plot_time = 0.0
+        self._blitting = False
+        self._bg = None
+        self.canvas.mpl_connect('draw_event', self.on_canvas_draw)
+        self.canvas.mpl_connect('resize_event', self.on_canvas_resize)
+
         self.setLayout(layout)
         self.setWindowTitle('Sweep Function App')
         self.show()
@@ -183,10 +313,43 @@ class SweepApp(QWidget):
         if max_voltage:
             self.keithley.write(f":SENS:VOLT:PROT {max_voltage}")  # Set voltage compliance
 
+        # Integration time for both measure functions
+        nplc = self.nplc_input.text().strip()
+        self._restore_nplc = None
+        if nplc:
+            # Remember the current integration times so they can be restored after the sweep
+            self._restore_nplc = (self.keithley.query(':SENS:CURR:NPLC?').strip(),
+                                  self.keithley.query(':SENS:VOLT:NPLC?').strip())
+            self.keithley.write(f':SENS:CURR:NPLC {nplc}')
+            self.keithley.write(f':SENS:VOLT:NPLC {nplc}')
+
+        if self.autozero_check.isChecked():
+            self.keithley.write(':SYST:AZER:STAT ON')
+        else:
+            self.keithley.write(':SYST:AZER:STAT OFF')  # Skip autozero between points
+
+        # Return only voltage and current, as little-endian IEEE-754 single-precision floats
+        self.keithley.write(':FORM:ELEM VOLT,CURR')
+        self.keithley.write(':FORM:DATA REAL,32')
+        self.keithley.write(':FORM:BORD SWAP')
+
+        # Use the built-in linear sweep; start/stop/points are set per chunk in IVsweep
+        source = 'VOLT' if self.voltage_sweep_radio.isChecked() else 'CURR'
+        self.keithley.write(f':SOUR:{source}:MODE SWE')
+        self.keithley.write(':SOUR:SWE:SPAC LIN')
+        self.keithley.write(':SOUR:SWE:RANG AUTO')
+
+        # Settling time between source and measure, timed by the instrument
+        delay = self.delay_input.text().strip()
+        if delay:
+            self.keithley.write(f':SOUR:DEL {delay}')
+
         self.keithley.write(':OUTP ON')  # Turn output ON
 
     def start_sweep(self):
-        self.abort_sweep = False
+        if self.sweep_thread is not None:
+            QMessageBox.warning(self, "Sweep Running", "A sweep is already in progress.")
+            return
         start = float(self.start_input.text())
         stop = float(self.stop_input.text())
         points = int(self.points_input.text())
@@ -196,47 +359,61 @@ class SweepApp(QWidget):
         self.IVsweep(start, stop, points, delay)
 
     def abort_sweep_func(self):
-        self.abort_sweep = True
-
-    def IVsweep(self, start, stop, points, delay):
-        """Perform I-V sweep."""
-        sweep_values = np.linspace(start, stop, points)
-        currents = []  # List to store measured currents
-        voltages = []  # List to store measured voltages
-
-        for value in sweep_values:
-            if self.abort_sweep:
-                QMessageBox.information(self, "Sweep Aborted", "The sweep was aborted.")
-                break
-
-            if self.voltage_sweep_radio.isChecked():
-                self.keithley.write(f':SOUR:VOLT {value}')  # Set voltage
-            else:
-                self.keithley.write(f':SOUR:CURR {value}')  # Set current
-
-            time.sleep(delay)  # Allow time for measurement
-
-            try:
-                response = self.keithley.query(':MEAS?').strip()  # Get and clean the response
-                values = response.split(',')  # Split the response into separate values
-
-                if len(values) > 1:
-                    voltage = float(values[0])
-                    current = float(values[1])
-                else:
-                    voltage = 0
-                    current = 0
-            except ValueError:
-                voltage = 0
-                current = 0
-
-            voltages.append(voltage)
-            currents.append(-current)
-            print(f"Set Value: {value:.10f}, Voltage: {voltage:.6f} V, Current: {current:.10f} A")
+        if self.sweep_worker:
+            self.sweep_worker.abort = True
 
-            self.update_live_plot(voltages, currents)
+    def estimate_point_time(self, delay):
+        """Estimate the instrument time per point from the source delay and integration settings."""
+        nplc = float(self.nplc_input.text().strip() or DEFAULT_NPLC)
+        integration = nplc / LINE_FREQUENCY
+        if self.autozero_check.isChecked():
+            integration *= AUTOZERO_FACTOR
+        return delay + integration + POINT_OVERHEAD_SECONDS
 
-        self.keithley.write(':OUTP OFF')  # Turn output off
+    def IVsweep(self, start, stop, points, delay):
+        """Start the I-V sweep on a worker thread."""
+        source = 'VOLT' if self.voltage_sweep_radio.isChecked() else 'CURR'
+
+        # Preallocated measurement buffers, only the first _n points are valid
+        self._v = np.empty(points, dtype=np.float64)
+        self._i = np.empty(points, dtype=np.float64)
+        self._n = 0
+        self.start_live_plot(start, stop)
+
+        self.sweep_thread = QThread()
+        self.sweep_worker = SweepWorker(self.keithley, source, start, stop, points,
+                                        self.estimate_point_time(delay), self._debug,
+                                        restore_nplc=self._restore_nplc)
+        self.sweep_worker.moveToThread(self.sweep_thread)
+
+        self.sweep_thread.started.connect(self.sweep_worker.run)
+        self.sweep_worker.readingsReady.connect(self.on_readings_ready)
+        self.sweep_worker.error.connect(self.on_sweep_error)
+        self.sweep_worker.finished.connect(self.on_sweep_finished)
+        self.sweep_worker.finished.connect(self.sweep_thread.quit)
+        self.sweep_thread.finished.connect(self.on_sweep_thread_finished)
+        self.sweep_thread.start()
+
+    def on_readings_ready(self, voltages, currents):
+        """Append one chunk of readings from the worker and refresh the live plot."""
+        end = self._n + len(voltages)
+        self._v[self._n:end] = voltages
+        self._i[self._n:end] = currents
+        self._n = end
+        self.update_live_plot(self._v[:end], self._i[:end])
+
+    def on_sweep_error(self, message):
+        """Report an error raised on the sweep worker thread."""
+        print(message)
+        QMessageBox.critical(self, "Sweep Error", message)
+
+    def on_sweep_finished(self, aborted):
+        """Show the final data, then save it and create the static plot."""
+        voltages, currents = self._v[:self._n], self._i[:self._n]
+        self.update_live_plot(voltages, currents, force=True)
+        self.stop_live_plot()
+        if aborted:
+            QMessageBox.information(self, "Sweep Aborted", "The sweep was aborted.")
 
         # Save data to CSV
         data = {
@@ -249,19 +426,95 @@ class SweepApp(QWidget):
         # Plot I-V curve
         self.create_static_plot(voltages, currents)
 
-    def update_live_plot(self, voltages, currents):
-        """Update the live plot."""
-        self.figure.clear()
-        ax = self.figure.add_subplot(111)
-        ax.plot(voltages, currents, marker='.', linestyle='-')
-        ax.set_xlabel("Voltage (V)")
-        ax.set_ylabel("Current (A)")
-        self.canvas.draw()
+    def on_sweep_thread_finished(self):
+        """Release the worker thread once it has stopped."""
+        self.sweep_thread.wait()
+        self.sweep_thread = None
+        self.sweep_worker = None
+
+    def start_live_plot(self, start, stop):
+        """Clear the live plot and fix the x-range when it is known up front."""
+        self._line.set_data([], [])
+        self._ax.set_autoscalex_on(True)
+        if self.voltage_sweep_radio.isChecked() and start != stop:
+            # x is the sourced voltage, so only the current axis needs rescaling
+            pad = 0.02 * abs(stop - start)
+            self._ax.set_xlim(min(start, stop) - pad, max(start, stop) + pad)
+        self._line.set_animated(True)
+        self._blitting = True
+        self._bg = None
+        self.canvas.draw_idle()
+
+    def stop_live_plot(self):
+        """Return the plot to normal (non-blitted) drawing after a sweep."""
+        self._blitting = False
+        self._bg = None
+        self._line.set_animated(False)
+        self.canvas.draw_idle()
+
+    def update_live_plot(self, voltages, currents, force=False):
+        """Update the live plot, at most every 100 ms unless forced."""
+        now = time.monotonic()
+        if len(voltages) == 0 or (not force and now - self._last_plot_time < 0.1):
+            return
+        self._last_plot_time = now
+
+        self._line.set_data(voltages, currents)
+
+        # Full redraw outside a sweep, when there is no background yet or the data left the view
+        if not self._blitting or self._bg is None or self.is_outside_view(voltages, currents):
+            self._ax.relim()
+            self._ax.autoscale_view()
+            self._bg = None  # Recaptured by on_canvas_draw
+            self.canvas.draw_idle()
+            return
+
+        # Otherwise only redraw the line on top of the cached background
+        self.canvas.restore_region(self._bg)
+        self._ax.draw_artist(self._line)
+        self.canvas.blit(self._ax.bbox)
+
+    def is_outside_view(self, voltages, currents):
+        """Return True if any point falls outside the current axes limits."""
+        x_low, x_high = sorted(self._ax.get_xlim())
+        y_low, y_high = sorted(self._ax.get_ylim())
+        return (voltages.min() < x_low or voltages.max() > x_high
+                or currents.min() < y_low or currents.max() > y_high)
+
+    def on_canvas_draw(self, event):
+        """Cache the background after a full redraw and draw the line on it."""
+        if not self._blitting:
+            return
+        self._bg = self.canvas.copy_from_bbox(self._ax.bbox)
+        self._ax.draw_artist(self._line)
+
+    def on_canvas_resize(self, event):
+        """Drop the cached background; it no longer matches the canvas size."""
+        self._bg = None
+
+    def get_file_path(self, key, title, filters):
+        """Show the cached save dialog for key and return (file path, selected filter).
+
+        Each purpose keeps one dialog, created on first use, so later calls keep
+        its directory, filter and sort order. Returns ("", "") if cancelled.
+        """
+        dialog = self._file_dialogs.get(key)
+        if dialog is None:
+            dialog = QFileDialog(self, title, self._last_dir, filters)
+            dialog.setAcceptMode(QFileDialog.AcceptSave)
+            # Skip per-file icon lookups, which stat every entry on slow/network filesystems
+            dialog.setOption(QFileDialog.DontUseCustomDirectoryIcons)
+            self._file_dialogs[key] = dialog
+
+        if not dialog.exec_():
+            return "", ""
+        file_path = dialog.selectedFiles()[0]
+        self._last_dir = os.path.dirname(file_path)
+        return file_path, dialog.selectedNameFilter()
 
     def save_data_to_csv(self, df):
         """Save the plot and data to a CSV file."""
-        options = QFileDialog.Options()
-        file_path, _ = QFileDialog.getSaveFileName(self, "Save Data", "", "CSV Files (*.csv);;All Files (*)", options=options)
+        file_path, _ = self.get_file_path('save_data', "Save Data", "CSV Files (*.csv);;All Files (*)")
         if file_path:
             df.to_csv(file_path, index=False)
             QMessageBox.information(self, "Success", f"Data saved to {file_path}")
@@ -278,13 +531,16 @@ class SweepApp(QWidget):
         plt.show()
 
         # Save static plot as PNG
-        options = QFileDialog.Options()
-        file_path, _ = QFileDialog.getSaveFileName(self, "Save Plot", "", "PNG Files (*.png);;All Files (*)", options=options)
+        file_path, _ = self.get_file_path('save_plot', "Save Plot", "PNG Files (*.png);;All Files (*)")
         if file_path:
             static_fig.savefig(file_path)
             QMessageBox.information(self, "Success", f"Plot saved to {file_path}")
 
     def closeEvent(self, event):
+        if self.sweep_thread is not None:
+            self.sweep_worker.abort = True
+            self.sweep_thread.quit()
+            self.sweep_thread.wait()
         if self.keithley:
             self.keithley.close()
         event.accept()